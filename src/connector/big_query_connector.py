@@ -1,65 +1,223 @@
 
-import os
-import sys
+import io
+import itertools
+import math
 import logging
-from typing import Dict, List, Any
+import uuid
+from functools import lru_cache
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Any, Optional, Set, Union
 
 import pandas as pd
-from dotenv import load_dotenv
+import pyarrow as pa
 from google.cloud import bigquery
+from google.cloud import bigquery_storage_v1
+from google.cloud import storage
+from google.cloud.bigquery_storage_v1 import types as storage_types
+from google.cloud.bigquery_storage_v1 import writer as storage_writer
 from google.oauth2 import service_account
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+from connector.config import Config
+from connector.parquet_sink import ParquetSink, write_parquet
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('replication.log')
-    ]
-)
 logger = logging.getLogger('sql_to_bq_replicator')
 
-# Load environment variables
-load_dotenv()
+# Rows converted at a time for Storage Write API AppendRows requests
+STREAM_APPEND_REQUEST_ROWS = 1000
+
+# Serialized row bytes per AppendRows request, kept below the API's 10 MB request limit
+STREAM_APPEND_REQUEST_MAX_BYTES = 9 * 1024 * 1024
+
+# Appends get one more concurrent stream per this many bytes, up to BQ_WRITE_STREAMS, so small change
+# sets cost a single CreateWriteStream instead of one per configured stream
+STREAM_APPEND_BYTES_PER_STREAM = 8 * 1024 * 1024
+
+# Incremental batches above this size are merged through a single staged load job instead of the Storage Write API
+STREAM_APPEND_MAX_BYTES = 50 * 1024 * 1024
+
+# SQL Server column types mapped to BigQuery column types
+_SQL_TO_BQ_TYPE = {
+    'char': 'STRING',
+    'varchar': 'STRING',
+    'nvarchar': 'STRING',
+    'nchar': 'STRING',
+    'text': 'STRING',
+    'ntext': 'STRING',
+    'int': 'INTEGER',
+    'smallint': 'INTEGER',
+    'tinyint': 'INTEGER',
+    'bigint': 'INTEGER',
+    'decimal': 'NUMERIC',
+    'numeric': 'NUMERIC',
+    'money': 'NUMERIC',
+    'smallmoney': 'NUMERIC',
+    'float': 'FLOAT',
+    'real': 'FLOAT',
+    'date': 'DATETIME',
+    'datetime': 'DATETIME',
+    'datetime2': 'DATETIME',
+    'smalldatetime': 'DATETIME',
+    'time': 'TIME',
+    'bit': 'BOOLEAN',
+    'binary': 'BYTES',
+    'varbinary': 'BYTES',
+    'image': 'BYTES',
+    'uniqueidentifier': 'STRING',
+}
+
+# Deletes with at most this many keys are sent as query parameters instead of a staged MERGE
+DELETE_PARAMETER_MAX_ROWS = 10000
+
+# Legacy SQL type names reported by table schemas mapped to their standard SQL parameter types
+_STANDARD_SQL_TYPE = {
+    'INTEGER': 'INT64',
+    'FLOAT': 'FLOAT64',
+    'BOOLEAN': 'BOOL',
+}
+
+# Proto field types used to send each BigQuery column type through the Storage Write API
+_BQ_TO_PROTO_TYPE = {
+    'STRING': descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    'INTEGER': descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    'INT64': descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    'FLOAT': descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+    'FLOAT64': descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+    'BOOLEAN': descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+    'BOOL': descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+    'BYTES': descriptor_pb2.FieldDescriptorProto.TYPE_BYTES,
+    'NUMERIC': descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    'DATETIME': descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    'DATE': descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    'TIME': descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+}
+
+
+# Field number of the Storage Write API's column_name field option (google/cloud/bigquery/storage/v1/annotations.proto)
+_COLUMN_NAME_OPTION_NUMBER = 454943157
+
+
+def _column_name_option(column_name: str) -> descriptor_pb2.FieldOptions:
+    """Build field options mapping a proto field to a BigQuery column whose name is not a valid proto identifier."""
+    # The annotation is not shipped with the client library, so its length-delimited field is encoded directly
+    tag = _COLUMN_NAME_OPTION_NUMBER << 3 | 2
+    value = column_name.encode('utf-8')
+    options = descriptor_pb2.FieldOptions()
+    options.MergeFromString(_encode_varint(tag) + _encode_varint(len(value)) + value)
+    return options
+
+
+def _encode_varint(number: int) -> bytes:
+    """Encode a non-negative integer as a protobuf varint."""
+    encoded = bytearray()
+    while number > 0x7F:
+        encoded.append(number & 0x7F | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
+
+
+def _quote_identifier(name: str) -> str:
+    """Quote a column name for use in GoogleSQL, so reserved words and unusual names stay valid."""
+    return f"`{name}`"
+
 
-# Configuration
+def _key_parameter_values(field: bigquery.SchemaField, values: List[Any]) -> List[Any]:
+    """Convert primary key values read from SQL Server to the Python types BigQuery expects for the field's type."""
+    # SQL Server date columns land in DATETIME columns, but the client cannot serialize a date for a DATETIME parameter
+    if field.field_type == 'DATETIME':
+        return [
+            datetime.combine(value, time()) if isinstance(value, date) and not isinstance(value, datetime) else value
+            for value in values
+        ]
+    return values
 
 
-GOOGLE_APPLICATION_CREDENTIALS = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-BQ_PROJECT_ID = os.getenv('BQ_PROJECT_ID')
-BQ_DATASET = os.getenv('BQ_DATASET')
+def _to_proto_value(value: Any) -> Any:
+    """Convert a Python value to the representation expected by its proto field."""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
 
-TABLES_TO_REPLICATE = os.getenv('TABLES_TO_REPLICATE', '').split(',')
-BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
-# Set log level from environment
-logger.setLevel(getattr(logging, LOG_LEVEL))
+def _proto_value_converter(arrow_type: pa.DataType) -> Optional[Callable[[Any], Any]]:
+    """Pick the conversion to proto field values for a column type, or None when values pass through as-is."""
+    if pa.types.is_timestamp(arrow_type):
+        return lambda value: value.isoformat(sep=' ')
+    if pa.types.is_date(arrow_type) or pa.types.is_time(arrow_type):
+        return lambda value: value.isoformat()
+    if pa.types.is_decimal(arrow_type):
+        return str
+    if (pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type) or pa.types.is_integer(arrow_type)
+            or pa.types.is_floating(arrow_type) or pa.types.is_boolean(arrow_type) or pa.types.is_binary(arrow_type)):
+        return None
+    return _to_proto_value
+
+
+@lru_cache(maxsize=None)
+def _get_credentials(credentials_file: str) -> service_account.Credentials:
+    """Load service account credentials once per process and reuse them for every connection."""
+    return service_account.Credentials.from_service_account_file(
+        credentials_file,
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_bigquery_client(project_id: str, credentials_file: Optional[str]) -> bigquery.Client:
+    """Create one BigQuery client per process, so its HTTP session and keep-alive connections are reused."""
+    if credentials_file:
+        return bigquery.Client(credentials=_get_credentials(credentials_file), project=project_id)
+    # Use default credentials
+    return bigquery.Client(project=project_id)
+
+
+@lru_cache(maxsize=None)
+def _get_bigquery_write_client(credentials_file: Optional[str]) -> bigquery_storage_v1.BigQueryWriteClient:
+    """Create one Storage Write API client per process, so its gRPC channel is reused."""
+    credentials = _get_credentials(credentials_file) if credentials_file else None
+    return bigquery_storage_v1.BigQueryWriteClient(credentials=credentials)
+
+
+@lru_cache(maxsize=None)
+def _get_gcs_client(project_id: str, credentials_file: Optional[str]) -> storage.Client:
+    """Create one Cloud Storage client per process, so its HTTP session is reused."""
+    credentials = _get_credentials(credentials_file) if credentials_file else None
+    return storage.Client(project=project_id, credentials=credentials)
+
 
 class BigQueryConnection:
     """Manages connection to BigQuery and provides data loading methods."""
     
-    def __init__(self):
+    def __init__(self, config: Config):
         self.client = None
+        self.credentials_file = config.google_application_credentials
+        self.project_id = config.bq_project_id
+        self.dataset = config.bq_dataset
+        self.batch_rows = config.bq_load_batch_rows
+        self.batch_bytes = config.bq_load_batch_bytes
+        self.staging_bucket = config.gcs_staging_bucket
+        self.write_streams = config.bq_write_streams
+        self._dataset_ref = None
+        self._existing_tables: Optional[Set[str]] = None
         
     def connect(self):
         """Establish connection to BigQuery."""
         try:
-            if GOOGLE_APPLICATION_CREDENTIALS:
-                credentials = service_account.Credentials.from_service_account_file(
-                    GOOGLE_APPLICATION_CREDENTIALS,
-                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
-                )
-                self.client = bigquery.Client(
-                    credentials=credentials,
-                    project=BQ_PROJECT_ID
-                )
-            else:
-                # Use default credentials
-                self.client = bigquery.Client(project=BQ_PROJECT_ID)
-                
-            logger.info(f"Connected to BigQuery project: {BQ_PROJECT_ID}")
+            # Clients are shared by every connection in the process, so only the first connect pays for TLS and auth
+            self.client = _get_bigquery_client(self.project_id, self.credentials_file)
+            
+            logger.info(f"Connected to BigQuery project: {self.project_id}")
+            
+            self._dataset_ref = bigquery.DatasetReference(self.project_id, self.dataset)
+            self._existing_tables = None
             
             # Ensure dataset exists
             self._ensure_dataset_exists()
@@ -72,33 +230,42 @@ class BigQueryConnection:
     def _ensure_dataset_exists(self):
         """Ensure the BigQuery dataset exists, create if it doesn't."""
         try:
-            dataset_ref = self.client.dataset(BQ_DATASET)
+            dataset_ref = self._dataset_ref
             try:
                 self.client.get_dataset(dataset_ref)
-                logger.info(f"Dataset {BQ_DATASET} already exists")
+                logger.info(f"Dataset {self.dataset} already exists")
             except Exception:
                 # Dataset does not exist, create it
                 dataset = bigquery.Dataset(dataset_ref)
                 dataset.location = "US"  # Set the location
                 self.client.create_dataset(dataset)
-                logger.info(f"Created dataset {BQ_DATASET}")
+                logger.info(f"Created dataset {self.dataset}")
         except Exception as e:
             logger.error(f"Failed to ensure dataset exists: {e}")
     
     def close(self):
         """Close the BigQuery connection."""
-        if self.client:
-            self.client.close()
+        # The clients themselves stay open for reuse by later connections in this process
+        self.client = None
+        self._dataset_ref = None
+        self._existing_tables = None
         logger.info("BigQuery connection closed")
     
     def table_exists(self, table_name: str) -> bool:
         """Check if a table exists in BigQuery."""
-        try:
-            table_ref = self.client.dataset(BQ_DATASET).table(table_name)
-            self.client.get_table(table_ref)
-            return True
-        except Exception:
-            return False
+        # List the dataset once instead of issuing a GetTable request per table
+        if self._existing_tables is None:
+            try:
+                self._existing_tables = {table.table_id for table in self.client.list_tables(self._dataset_ref)}
+            except Exception as e:
+                logger.warning(f"Failed to list tables in {self.dataset}: {e}")
+                try:
+                    self.client.get_table(self._dataset_ref.table(table_name))
+                    return True
+                except Exception:
+                    return False
+        
+        return table_name in self._existing_tables
     
     def create_table(self, table_name: str, schema_columns: List[Dict[str, Any]]) -> bool:
         """Create a table in BigQuery with the given schema."""
@@ -107,7 +274,7 @@ class BigQueryConnection:
             bq_schema = self._convert_schema(schema_columns)
             
             # Create the table
-            table_ref = self.client.dataset(BQ_DATASET).table(table_name)
+            table_ref = self._dataset_ref.table(table_name)
             table = bigquery.Table(table_ref, schema=bq_schema)
             
             # Add clustering fields if primary keys are available
@@ -116,7 +283,9 @@ class BigQueryConnection:
                 table.clustering_fields = pk_columns[:4]  # BigQuery supports up to 4 clustering fields
             
             self.client.create_table(table)
-            logger.info(f"Created table {BQ_DATASET}.{table_name}")
+            if self._existing_tables is not None:
+                self._existing_tables.add(table_name)
+            logger.info(f"Created table {self.dataset}.{table_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to create table {table_name}: {e}")
@@ -132,27 +301,8 @@ class BigQueryConnection:
             is_nullable = column['is_nullable']
             
             # Map SQL Server types to BigQuery types
-            if sql_type in ('char', 'varchar', 'nvarchar', 'nchar', 'text', 'ntext'):
-                bq_type = 'STRING'
-            elif sql_type in ('int', 'smallint', 'tinyint'):
-                bq_type = 'INTEGER'
-            elif sql_type == 'bigint':
-                bq_type = 'INTEGER'
-            elif sql_type in ('decimal', 'numeric', 'money', 'smallmoney'):
-                bq_type = 'NUMERIC'
-            elif sql_type in ('float', 'real'):
-                bq_type = 'FLOAT'
-            elif sql_type in ('date', 'datetime', 'datetime2', 'smalldatetime'):
-                bq_type = 'DATETIME'
-            elif sql_type == 'time':
-                bq_type = 'TIME'
-            elif sql_type == 'bit':
-                bq_type = 'BOOLEAN'
-            elif sql_type in ('binary', 'varbinary', 'image'):
-                bq_type = 'BYTES'
-            elif sql_type == 'uniqueidentifier':
-                bq_type = 'STRING'
-            else:
+            bq_type = _SQL_TO_BQ_TYPE.get(sql_type)
+            if bq_type is None:
                 logger.warning(f"Unknown SQL type {sql_type} for column {field_name}, defaulting to STRING")
                 bq_type = 'STRING'
             
@@ -167,38 +317,335 @@ class BigQueryConnection:
         
         return bq_schema
     
-    def load_dataframe(self, df: pd.DataFrame, table_name: str, write_disposition: str = 'WRITE_TRUNCATE') -> bool:
-        """Load a DataFrame into a BigQuery table."""
-        if df.empty:
+    def load_dataframe(self, data: Union[pd.DataFrame, pa.Table], table_name: str, write_disposition: str = 'WRITE_TRUNCATE') -> bool:
+        """Load a DataFrame or Arrow table into a BigQuery table."""
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+        
+        if data.num_rows == 0:
             logger.info(f"No data to load for table {table_name}")
             return True
         
         try:
-            # Configure the load job
-            job_config = bigquery.LoadJobConfig(
-                write_disposition=write_disposition,
-                source_format=bigquery.SourceFormat.PARQUET,
-            )
+            # Split large tables so no load job exceeds the row or byte threshold
+            num_chunks = max(1, math.ceil(data.nbytes / self.batch_bytes), math.ceil(data.num_rows / self.batch_rows))
+            chunk_rows = math.ceil(data.num_rows / num_chunks)
+            chunks = [data.slice(offset, chunk_rows) for offset in range(0, data.num_rows, chunk_rows)]
             
-            # Convert DataFrame to Parquet in memory
-            parquet_buffer = df.to_parquet()
+            self._load_files((write_parquet(chunk) for chunk in chunks), table_name, write_disposition)
             
-            # Load the data
-            table_ref = self.client.dataset(BQ_DATASET).table(table_name)
-            load_job = self.client.load_table_from_file(
-                io.BytesIO(parquet_buffer),
-                table_ref,
-                job_config=job_config
+            logger.info(f"Loaded {data.num_rows} rows into {self.dataset}.{table_name} in {len(chunks)} load job(s)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load data into {table_name}: {e}")
+            return False
+    
+    def load_batches(self, batches: Iterable[pa.RecordBatch], table_name: str,
+                     write_disposition: str = 'WRITE_TRUNCATE') -> bool:
+        """Stream Arrow record batches into a BigQuery table as a series of bounded Parquet load jobs."""
+        sink = ParquetSink(max_bytes=self.batch_bytes, max_rows=self.batch_rows)
+        
+        try:
+            parquet_files = sink.iter_files(batches)
+            first_file = next(parquet_files, None)
+            if first_file is None:
+                logger.info(f"No data to load for table {table_name}")
+                return True
+            
+            parquet_files = itertools.chain([first_file], parquet_files)
+            if self.staging_bucket:
+                self._load_files_from_gcs(parquet_files, table_name, write_disposition)
+            else:
+                self._load_files(parquet_files, table_name, write_disposition)
+            
+            logger.info(
+                f"Loaded {sink.total_rows} rows into {self.dataset}.{table_name} from {sink.num_files} Parquet file(s)"
             )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load data into {table_name}: {e}")
+            return False
+    
+    def _load_files(self, parquet_files: Iterable[io.BytesIO], table_name: str, write_disposition: str):
+        """Load Parquet files into a BigQuery table with one load job each, starting every job as its file is ready."""
+        load_jobs = []
+        for parquet_file in parquet_files:
+            # The first file carries the caller's write disposition and must finish before
+            # the remaining files are appended, so a truncating load cannot discard them
+            if load_jobs:
+                load_jobs.append(self._start_file_load_job(parquet_file, table_name, 'WRITE_APPEND'))
+            else:
+                load_job = self._start_file_load_job(parquet_file, table_name, write_disposition)
+                load_job.result()
+                load_jobs.append(load_job)
+        
+        for load_job in load_jobs[1:]:
+            load_job.result()
+    
+    def _load_files_from_gcs(self, parquet_files: Iterable[io.BytesIO], table_name: str, write_disposition: str):
+        """Stage Parquet files as shards in GCS and load them all with a single load job."""
+        bucket = self._get_storage_client().bucket(self.staging_bucket)
+        prefix = f"stage/{table_name}/{uuid.uuid4().hex}/"
+        blobs = []
+        
+        try:
+            for parquet_file in parquet_files:
+                blob = bucket.blob(f"{prefix}{len(blobs):06d}.parquet")
+                blob.upload_from_file(parquet_file, content_type='application/octet-stream')
+                blobs.append(blob)
             
-            # Wait for the job to complete
+            # One load job over every shard lets BigQuery ingest them in parallel and retry without re-uploading
+            load_job = self.client.load_table_from_uri(
+                f"gs://{self.staging_bucket}/{prefix}*.parquet",
+                self._dataset_ref.table(table_name),
+                job_config=self._parquet_load_job_config(write_disposition),
+            )
             load_job.result()
+        finally:
+            for blob in blobs:
+                try:
+                    blob.delete()
+                except Exception as e:
+                    logger.warning(f"Failed to delete staged file {blob.name}: {e}")
+    
+    def _get_storage_client(self) -> storage.Client:
+        """Get the process-wide Cloud Storage client."""
+        return _get_gcs_client(self.project_id, self.credentials_file)
+    
+    def _parquet_load_job_config(self, write_disposition: str,
+                                 schema: Optional[List[bigquery.SchemaField]] = None) -> bigquery.LoadJobConfig:
+        """Build the configuration for a Parquet load job."""
+        parquet_options = bigquery.format_options.ParquetOptions()
+        parquet_options.enable_list_inference = True
+        job_config = bigquery.LoadJobConfig(
+            write_disposition=write_disposition,
+            source_format=bigquery.SourceFormat.PARQUET,
+            parquet_options=parquet_options,
+        )
+        if schema is not None:
+            job_config.schema = schema
+        return job_config
+    
+    def _start_load_job(self, data: pa.Table, table_name: str, write_disposition: str,
+                        schema: Optional[List[bigquery.SchemaField]] = None) -> bigquery.LoadJob:
+        """Upload an Arrow table as Parquet and start a load job without waiting for it."""
+        return self._start_file_load_job(write_parquet(data), table_name, write_disposition, schema)
+    
+    def _start_file_load_job(self, parquet_file: io.BytesIO, table_name: str, write_disposition: str,
+                             schema: Optional[List[bigquery.SchemaField]] = None) -> bigquery.LoadJob:
+        """Upload a Parquet file and start a load job without waiting for it."""
+        return self.client.load_table_from_file(
+            parquet_file,
+            self._dataset_ref.table(table_name),
+            job_config=self._parquet_load_job_config(write_disposition, schema)
+        )
+    
+    def merge_rows(self, data: pa.Table, table_name: str, pk_columns: List[str]) -> bool:
+        """Upsert rows into a BigQuery table by staging them and merging on the primary key."""
+        if data.num_rows == 0:
+            logger.info(f"No data to merge for table {table_name}")
+            return True
+        
+        stage_table = f"{table_name}__stage_{uuid.uuid4().hex}"
+        try:
+            # Stage with the target's schema so the MERGE compares and copies identical column types
+            target_schema = self.client.get_table(self._dataset_ref.table(table_name)).schema
+            self._start_load_job(data, stage_table, 'WRITE_TRUNCATE', schema=target_schema).result()
+            
+            update_columns = [field.name for field in target_schema if field.name not in pk_columns]
+            update_clause = ''
+            if update_columns:
+                assignments = ', '.join(f'{_quote_identifier(name)} = S.{_quote_identifier(name)}' for name in update_columns)
+                update_clause = f"WHEN MATCHED THEN UPDATE SET {assignments}"
             
-            logger.info(f"Loaded {len(df)} rows into {BQ_DATASET}.{table_name}")
+            merge_query = f"""
+            MERGE `{self.project_id}.{self.dataset}.{table_name}` T
+            USING `{self.project_id}.{self.dataset}.{stage_table}` S
+            ON {' AND '.join(f'T.{_quote_identifier(pk)} = S.{_quote_identifier(pk)}' for pk in pk_columns)}
+            {update_clause}
+            WHEN NOT MATCHED THEN INSERT ROW
+            """
+            query_job = self.client.query(merge_query)
+            query_job.result()
+            
+            logger.info(f"Merged {data.num_rows} rows into {self.dataset}.{table_name}")
             return True
         except Exception as e:
-            logger.error(f"Failed to load data into {table_name}: {e}")
+            logger.error(f"Failed to merge data into {table_name}: {e}")
+            return False
+        finally:
+            try:
+                self.client.delete_table(self._dataset_ref.table(stage_table), not_found_ok=True)
+            except Exception as e:
+                logger.warning(f"Failed to drop staging table {stage_table}: {e}")
+    
+    def _get_write_client(self) -> bigquery_storage_v1.BigQueryWriteClient:
+        """Get the process-wide Storage Write API client."""
+        return _get_bigquery_write_client(self.credentials_file)
+    
+    def _build_row_message(self, table_name: str, schema: List[bigquery.SchemaField]):
+        """
+        Generate a proto descriptor and message class matching a BigQuery table schema.
+        
+        Column names such as "Order Date" are not valid proto field names, so fields
+        get synthetic names and are mapped to their columns with the column_name
+        annotation. The mapping from column name to field name is returned as well.
+        """
+        descriptor_proto = descriptor_pb2.DescriptorProto(name='ReplicatedRow')
+        field_names = {}
+        for number, field in enumerate(schema, start=1):
+            field_names[field.name] = f"f{number}"
+            descriptor_proto.field.add(
+                name=field_names[field.name],
+                number=number,
+                type=_BQ_TO_PROTO_TYPE.get(field.field_type, descriptor_pb2.FieldDescriptorProto.TYPE_STRING),
+                label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL,
+                options=_column_name_option(field.name),
+            )
+        
+        file_proto = descriptor_pb2.FileDescriptorProto(
+            name=f"{table_name}.proto",
+            package='replication',
+            syntax='proto2',
+        )
+        file_proto.message_type.add().CopyFrom(descriptor_proto)
+        
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        message_class = message_factory.GetMessageClass(pool.FindMessageTypeByName('replication.ReplicatedRow'))
+        
+        return descriptor_proto, message_class, field_names
+    
+    def _partition_rows(self, data: pa.Table, pk_columns: List[str], num_partitions: int) -> List[pa.Table]:
+        """Split rows into partitions by primary key hash, so every key is always sent on the same stream."""
+        if num_partitions <= 1:
+            return [data]
+        
+        if pk_columns:
+            keys = zip(*(data.column(name).to_pylist() for name in pk_columns))
+            buckets = [hash(key) % num_partitions for key in keys]
+        else:
+            buckets = [index % num_partitions for index in range(data.num_rows)]
+        
+        indices = [[] for _ in range(num_partitions)]
+        for index, bucket in enumerate(buckets):
+            indices[bucket].append(index)
+        return [data.take(pa.array(bucket_indices, type=pa.int64())) for bucket_indices in indices if bucket_indices]
+    
+    def _send_rows(self, append_stream: storage_writer.AppendRowsStream, proto_rows: storage_types.ProtoRows,
+                   offset: int) -> storage_writer.AppendRowsFuture:
+        """Send serialized rows on an append stream at the given stream offset without waiting for the result."""
+        # Explicit offsets make a resent request fail instead of writing its rows twice
+        request = storage_types.AppendRowsRequest(
+            offset=offset,
+            proto_rows=storage_types.AppendRowsRequest.ProtoData(rows=proto_rows),
+        )
+        return append_stream.send(request)
+    
+    def stream_append(self, data: Union[pd.DataFrame, pa.Table], table_name: str, pk_columns: List[str] = None) -> bool:
+        """
+        Append rows to a BigQuery table through concurrent Storage Write API pending streams.
+        
+        The streams are committed together only after every partition has been
+        written, so a failed append leaves the table unchanged and can be retried
+        without duplicating rows.
+        """
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+        
+        if data.num_rows == 0:
+            logger.info(f"No data to append for table {table_name}")
+            return True
+        
+        append_streams = []
+        try:
+            table = self.client.get_table(self._dataset_ref.table(table_name))
+            descriptor_proto, row_class, proto_field_names = self._build_row_message(table_name, table.schema)
+            write_client = self._get_write_client()
+            table_path = write_client.table_path(self.project_id, self.dataset, table_name)
+            
+            # Resolve each column's conversion once from the Arrow schema instead of inspecting every value
+            column_names = [proto_field_names[name] for name in data.column_names]
+            converters = [_proto_value_converter(field.type) for field in data.schema]
+            
+            # Each partition gets its own pending stream, so appends run concurrently
+            # while rows for the same primary key stay in order on a single stream
+            write_streams = []
+            futures = []
+            num_streams = min(self.write_streams, math.ceil(data.nbytes / STREAM_APPEND_BYTES_PER_STREAM))
+            for partition in self._partition_rows(data, pk_columns, num_streams):
+                write_stream = write_client.create_write_stream(
+                    parent=table_path,
+                    write_stream=storage_types.WriteStream(type_=storage_types.WriteStream.Type.PENDING),
+                )
+                write_streams.append(write_stream)
+                
+                request_template = storage_types.AppendRowsRequest(
+                    write_stream=write_stream.name,
+                    proto_rows=storage_types.AppendRowsRequest.ProtoData(
+                        writer_schema=storage_types.ProtoSchema(proto_descriptor=descriptor_proto)
+                    ),
+                )
+                append_stream = storage_writer.AppendRowsStream(write_client, request_template)
+                append_streams.append(append_stream)
+                
+                # Send all batches before waiting so appends are pipelined on the stream
+                offset = 0
+                for start in range(0, partition.num_rows, STREAM_APPEND_REQUEST_ROWS):
+                    batch = partition.slice(start, STREAM_APPEND_REQUEST_ROWS)
+                    columns = []
+                    for column, converter in zip(batch.columns, converters):
+                        values = column.to_pylist()
+                        if converter is not None:
+                            values = [None if value is None else converter(value) for value in values]
+                        columns.append(values)
+                    
+                    proto_rows = storage_types.ProtoRows()
+                    request_bytes = 0
+                    for row in zip(*columns):
+                        serialized_row = row_class(**{
+                            name: value for name, value in zip(column_names, row) if value is not None
+                        }).SerializeToString()
+                        
+                        # Wide rows can fill a request long before the row count does, so split on size too
+                        if proto_rows.serialized_rows and request_bytes + len(serialized_row) > STREAM_APPEND_REQUEST_MAX_BYTES:
+                            futures.append(self._send_rows(append_stream, proto_rows, offset))
+                            offset += len(proto_rows.serialized_rows)
+                            proto_rows = storage_types.ProtoRows()
+                            request_bytes = 0
+                        
+                        proto_rows.serialized_rows.append(serialized_row)
+                        request_bytes += len(serialized_row)
+                    
+                    futures.append(self._send_rows(append_stream, proto_rows, offset))
+                    offset += len(proto_rows.serialized_rows)
+            
+            for future in futures:
+                future.result()
+            
+            for write_stream in write_streams:
+                write_client.finalize_write_stream(name=write_stream.name)
+            
+            # Make every partition visible in one atomic commit; uncommitted pending streams are discarded
+            commit_response = write_client.batch_commit_write_streams(
+                request=storage_types.BatchCommitWriteStreamsRequest(
+                    parent=table_path,
+                    write_streams=[write_stream.name for write_stream in write_streams],
+                )
+            )
+            if commit_response.stream_errors:
+                raise RuntimeError(
+                    f"Failed to commit write streams: {'; '.join(error.error_message for error in commit_response.stream_errors)}"
+                )
+            
+            logger.info(f"Appended {data.num_rows} rows into {self.dataset}.{table_name} over {len(write_streams)} stream(s)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to append data into {table_name}: {e}")
             return False
+        finally:
+            for append_stream in append_streams:
+                append_stream.close()
     
     def delete_rows(self, table_name: str, pk_df: pd.DataFrame) -> bool:
         """Delete rows from a BigQuery table based on primary key values."""
@@ -207,35 +654,83 @@ class BigQueryConnection:
             return True
         
         try:
-            # Get the primary key column names
-            pk_columns = pk_df.columns.tolist()
-            
-            # Construct the DELETE query
-            delete_conditions = []
-            for _, row in pk_df.iterrows():
-                condition_parts = []
-                for pk in pk_columns:
-                    value = row[pk]
-                    if isinstance(value, str):
-                        condition_parts.append(f"{pk} = '{value}'")
-                    elif pd.isna(value):
-                        condition_parts.append(f"{pk} IS NULL")
-                    else:
-                        condition_parts.append(f"{pk} = {value}")
-                
-                delete_conditions.append(f"({' AND '.join(condition_parts)})")
-            
-            delete_query = f"""
-            DELETE FROM `{BQ_PROJECT_ID}.{BQ_DATASET}.{table_name}`
-            WHERE {' OR '.join(delete_conditions)}
-            """
+            table_ref = self._dataset_ref.table(table_name)
+            target_schema = self.client.get_table(table_ref).schema
+            pk_fields = [field for field in target_schema if field.name in pk_df.columns]
             
-            # Execute the query
-            query_job = self.client.query(delete_query)
-            query_job.result()
+            # Small key sets fit in query parameters; larger ones are staged and joined
+            if len(pk_df) <= DELETE_PARAMETER_MAX_ROWS:
+                self._delete_rows_with_parameters(table_name, pk_df, pk_fields)
+            else:
+                self._delete_rows_with_merge(table_name, pk_df, pk_fields)
             
-            logger.info(f"Deleted {len(pk_df)} rows from {BQ_DATASET}.{table_name}")
+            logger.info(f"Deleted {len(pk_df)} rows from {self.dataset}.{table_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to delete rows from {table_name}: {e}")
             return False
+    
+    def _delete_rows_with_parameters(self, table_name: str, pk_df: pd.DataFrame, pk_fields: List[bigquery.SchemaField]):
+        """Delete rows matching the given keys, passed as an array query parameter."""
+        if len(pk_fields) == 1:
+            field = pk_fields[0]
+            condition = f"T.{_quote_identifier(field.name)} IN UNNEST(@keys)"
+            keys = bigquery.ArrayQueryParameter(
+                'keys',
+                _STANDARD_SQL_TYPE.get(field.field_type, field.field_type),
+                _key_parameter_values(field, pk_df[field.name].tolist()),
+            )
+        else:
+            condition = f"""EXISTS (
+                SELECT 1 FROM UNNEST(@keys) K
+                WHERE {' AND '.join(f'K.{_quote_identifier(field.name)} = T.{_quote_identifier(field.name)}' for field in pk_fields)}
+            )"""
+            columns = [_key_parameter_values(field, pk_df[field.name].tolist()) for field in pk_fields]
+            keys = bigquery.ArrayQueryParameter('keys', 'STRUCT', [
+                bigquery.StructQueryParameter(None, *[
+                    bigquery.ScalarQueryParameter(
+                        field.name,
+                        _STANDARD_SQL_TYPE.get(field.field_type, field.field_type),
+                        value,
+                    )
+                    for field, value in zip(pk_fields, values)
+                ])
+                for values in zip(*columns)
+            ])
+        
+        delete_query = f"""
+        DELETE FROM `{self.project_id}.{self.dataset}.{table_name}` T
+        WHERE {condition}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[keys])
+        query_job = self.client.query(delete_query, job_config=job_config)
+        query_job.result()
+    
+    def _delete_rows_with_merge(self, table_name: str, pk_df: pd.DataFrame, pk_fields: List[bigquery.SchemaField]):
+        """Delete rows matching the given keys by staging them in a table and running a MERGE."""
+        tmp_ref = self._dataset_ref.table(f"{table_name}__deletes_{uuid.uuid4().hex}")
+        
+        try:
+            # Stage the keys in a throwaway table typed like the target's PK columns
+            job_config = bigquery.LoadJobConfig(
+                schema=pk_fields,
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition='WRITE_TRUNCATE',
+            )
+            load_job = self.client.load_table_from_dataframe(pk_df, tmp_ref, job_config=job_config)
+            load_job.result()
+            
+            # Delete all matching rows with a single join-based statement
+            merge_query = f"""
+            MERGE `{self.project_id}.{self.dataset}.{table_name}` T
+            USING `{self.project_id}.{self.dataset}.{tmp_ref.table_id}` S
+            ON {' AND '.join(f'T.{_quote_identifier(field.name)} = S.{_quote_identifier(field.name)}' for field in pk_fields)}
+            WHEN MATCHED THEN DELETE
+            """
+            query_job = self.client.query(merge_query)
+            query_job.result()
+        finally:
+            try:
+                self.client.delete_table(tmp_ref, not_found_ok=True)
+            except Exception as e:
+                logger.warning(f"Failed to drop staging table {tmp_ref.table_id}: {e}")
@@ -0,0 +1,119 @@
+import os
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Rows pulled from the ODBC driver per fetchmany() call
+DEFAULT_FETCH_SIZE = 5000
+
+# Load jobs are split so none carries more than this many rows or in-memory bytes
+DEFAULT_LOAD_BATCH_ROWS = 50000
+DEFAULT_LOAD_BATCH_BYTES = 100 * 1024 * 1024
+
+# Concurrent Storage Write API connections used to append each table's inserts
+DEFAULT_WRITE_STREAMS = 4
+
+# Tables replicated in parallel worker processes, one per CPU unless configured
+DEFAULT_REPLICATION_WORKERS = os.cpu_count() or 1
+
+
+def _positive_int(name: str, value: Optional[str], default: int, errors: List[str]) -> int:
+    """Parse an optional positive integer setting, recording a problem in errors if it is invalid."""
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        errors.append(f"{name} must be an integer, got {value!r}")
+        return default
+    if number <= 0:
+        errors.append(f"{name} must be positive, got {number}")
+    return number
+
+
+@dataclass(slots=True, frozen=True)
+class Config:
+    """Replication settings, read from the environment once and shared with every worker process."""
+    
+    sql_server: Optional[str]
+    sql_database: Optional[str]
+    sql_username: Optional[str]
+    sql_password: Optional[str]
+    sql_driver: str
+    google_application_credentials: Optional[str]
+    bq_project_id: Optional[str]
+    bq_dataset: Optional[str]
+    tables: Tuple[str, ...]
+    sql_fetch_size: int = DEFAULT_FETCH_SIZE
+    bq_load_batch_rows: int = DEFAULT_LOAD_BATCH_ROWS
+    bq_load_batch_bytes: int = DEFAULT_LOAD_BATCH_BYTES
+    bq_write_streams: int = DEFAULT_WRITE_STREAMS
+    gcs_staging_bucket: Optional[str] = None
+    replication_workers: int = DEFAULT_REPLICATION_WORKERS
+    log_level: str = 'WARNING'
+    
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """
+        Build the configuration from environment variables and the .env file.
+        
+        Every setting is checked up front and all problems are reported together,
+        so a misconfiguration fails at startup instead of partway through a run.
+        
+        Raises:
+            ValueError: If a required setting is missing or a setting has an invalid value
+        """
+        load_dotenv()
+        errors = []
+        
+        # Strip whitespace, drop empty entries and duplicates while keeping the configured order
+        tables = tuple(dict.fromkeys(
+            table_name.strip() for table_name in os.getenv('TABLES_TO_REPLICATE', '').split(',') if table_name.strip()
+        ))
+        if not tables:
+            errors.append("TABLES_TO_REPLICATE must name at least one table")
+        
+        for name in ('SQL_SERVER', 'SQL_DATABASE', 'BQ_PROJECT_ID', 'BQ_DATASET'):
+            if not os.getenv(name):
+                errors.append(f"{name} is required")
+        
+        log_level = os.getenv('LOG_LEVEL', 'WARNING').upper()
+        if not isinstance(logging.getLevelName(log_level), int):
+            errors.append(f"LOG_LEVEL must be one of DEBUG, INFO, WARNING, ERROR or CRITICAL, got {log_level!r}")
+        
+        config = dict(
+            sql_server=os.getenv('SQL_SERVER'),
+            sql_database=os.getenv('SQL_DATABASE'),
+            sql_username=os.getenv('SQL_USERNAME'),
+            sql_password=os.getenv('SQL_PASSWORD'),
+            sql_driver=os.getenv('SQL_DRIVER', '{ODBC Driver 17 for SQL Server}'),
+            google_application_credentials=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'),
+            bq_project_id=os.getenv('BQ_PROJECT_ID'),
+            bq_dataset=os.getenv('BQ_DATASET'),
+            tables=tables,
+            # SQL_FETCH_SIZE falls back to the older BATCH_SIZE setting when it is not set
+            sql_fetch_size=_positive_int(
+                'SQL_FETCH_SIZE', os.getenv('SQL_FETCH_SIZE', os.getenv('BATCH_SIZE')), DEFAULT_FETCH_SIZE, errors
+            ),
+            bq_load_batch_rows=_positive_int(
+                'BQ_LOAD_BATCH_ROWS', os.getenv('BQ_LOAD_BATCH_ROWS'), DEFAULT_LOAD_BATCH_ROWS, errors
+            ),
+            bq_load_batch_bytes=_positive_int(
+                'BQ_LOAD_BATCH_BYTES', os.getenv('BQ_LOAD_BATCH_BYTES'), DEFAULT_LOAD_BATCH_BYTES, errors
+            ),
+            bq_write_streams=_positive_int(
+                'BQ_WRITE_STREAMS', os.getenv('BQ_WRITE_STREAMS'), DEFAULT_WRITE_STREAMS, errors
+            ),
+            # Optional bucket for staging initial loads in Cloud Storage instead of uploading them directly
+            gcs_staging_bucket=os.getenv('GCS_STAGING_BUCKET') or None,
+            replication_workers=_positive_int(
+                'REPLICATION_WORKERS', os.getenv('REPLICATION_WORKERS'), DEFAULT_REPLICATION_WORKERS, errors
+            ),
+            log_level=log_level,
+        )
+        
+        if errors:
+            raise ValueError("Invalid configuration: " + "; ".join(errors))
+        return cls(**config)
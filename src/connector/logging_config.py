@@ -0,0 +1,65 @@
+import sys
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator, Optional
+
+from pythonjsonlogger.json import JsonFormatter
+
+# Each record is written to stdout as one JSON line, ready for container log collectors
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(table)s %(message)s'
+LOG_FIELD_NAMES = {'asctime': 'ts', 'levelname': 'lvl', 'message': 'msg'}
+
+# Table being replicated by the current process or thread, or None outside a table's replication
+_current_table: ContextVar[Optional[str]] = ContextVar('current_table', default=None)
+
+
+class _TableFilter(logging.Filter):
+    """Tag each record with the table being replicated, unless it was tagged already."""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Records from worker processes arrive tagged, so the listener must not overwrite them
+        if not hasattr(record, 'table'):
+            record.table = _current_table.get()
+        return True
+
+
+@contextmanager
+def log_table(table_name: str) -> Iterator[None]:
+    """Tag every record logged inside the block with table_name."""
+    token = _current_table.set(table_name)
+    try:
+        yield
+    finally:
+        _current_table.reset(token)
+
+
+def _make_stdout_handler() -> logging.Handler:
+    """Create the handler writing JSON log lines to stdout."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter(LOG_FORMAT, rename_fields=LOG_FIELD_NAMES))
+    handler.addFilter(_TableFilter())
+    return handler
+
+
+def configure_logging(log_level: str, log_queue: Optional[Any] = None):
+    """Hand records to the stdout listener through a queue when one is given, or write them to stdout directly."""
+    if log_queue is not None:
+        # Records are only enqueued here, so stdout writes never block the caller
+        handler = QueueHandler(log_queue)
+        handler.addFilter(_TableFilter())
+    else:
+        handler = _make_stdout_handler()
+    
+    root_logger = logging.getLogger()
+    root_logger.handlers = [handler]
+    root_logger.setLevel(logging.INFO)
+    logging.getLogger('sql_to_bq_replicator').setLevel(getattr(logging, log_level))
+
+
+def start_log_listener(log_queue: Any) -> QueueListener:
+    """Start a background listener writing queued records from every process to stdout."""
+    listener = QueueListener(log_queue, _make_stdout_handler())
+    listener.start()
+    return listener
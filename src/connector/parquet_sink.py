@@ -0,0 +1,89 @@
+import io
+from typing import Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Parquet settings for load jobs; zstd keeps text-heavy tables far smaller on the wire than the pandas defaults
+PARQUET_COMPRESSION = 'zstd'
+PARQUET_COMPRESSION_LEVEL = 3
+
+
+def write_parquet(table: pa.Table) -> io.BytesIO:
+    """Serialize an Arrow table to an in-memory Parquet file, rewound for reading."""
+    buffer = io.BytesIO()
+    pq.write_table(
+        table,
+        buffer,
+        compression=PARQUET_COMPRESSION,
+        compression_level=PARQUET_COMPRESSION_LEVEL,
+        use_dictionary=True,
+        write_statistics=True,
+    )
+    buffer.seek(0)
+    return buffer
+
+
+class ParquetSink:
+    """Stream Arrow record batches into a series of size-bounded in-memory Parquet files."""
+    
+    def __init__(self, max_bytes: int, max_rows: int):
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.buffer = None
+        self.writer = None
+        self.num_rows = 0
+        self.total_rows = 0
+        self.num_files = 0
+    
+    def iter_files(self, batches: Iterable[pa.RecordBatch]) -> Iterator[io.BytesIO]:
+        """Write every batch and yield each finished file, including the final partial one."""
+        for batch in batches:
+            yield from self.write(batch)
+        
+        parquet_file = self.flush()
+        if parquet_file is not None:
+            yield parquet_file
+    
+    def write(self, batch: pa.RecordBatch) -> List[io.BytesIO]:
+        """Append a batch to the current file, returning the files that reached a size threshold."""
+        finished = []
+        while batch.num_rows > 0:
+            # Split the batch so no file holds more than max_rows rows
+            head = batch.slice(0, self.max_rows - self.num_rows)
+            batch = batch.slice(head.num_rows)
+            
+            if self.writer is None:
+                self.buffer = io.BytesIO()
+                self.writer = pq.ParquetWriter(
+                    self.buffer,
+                    head.schema,
+                    compression=PARQUET_COMPRESSION,
+                    compression_level=PARQUET_COMPRESSION_LEVEL,
+                    use_dictionary=True,
+                    write_statistics=True,
+                )
+            
+            self.writer.write_batch(head)
+            self.num_rows += head.num_rows
+            self.total_rows += head.num_rows
+            
+            # The byte size is only known once a batch is encoded, so it can run over by up to one batch
+            if self.buffer.tell() >= self.max_bytes or self.num_rows >= self.max_rows:
+                finished.append(self.flush())
+        return finished
+    
+    def flush(self) -> Optional[io.BytesIO]:
+        """Finish the current file and return it rewound for reading, or None if nothing was written."""
+        if self.writer is None:
+            return None
+        
+        self.writer.close()
+        buffer = self.buffer
+        buffer.seek(0)
+        
+        self.buffer = None
+        self.writer = None
+        self.num_rows = 0
+        self.num_files += 1
+        return buffer
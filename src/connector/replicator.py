@@ -1,35 +1,62 @@
-import os
-import sys
+import atexit
 import logging
-from dotenv import load_dotenv
-from connector.big_query_connector import BigQueryConnection
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional
+from connector.big_query_connector import BigQueryConnection, STREAM_APPEND_MAX_BYTES
+from connector.config import Config
+from connector.logging_config import configure_logging, log_table
 from connector.state_manager import StateManager
 from connector.sql_server_connector import SQLServerConnection
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('replication.log')
-    ]
-)
 logger = logging.getLogger('sql_to_bq_replicator')
 
-# Load environment variables
-load_dotenv()
+# Replicator owned by a worker process, built for its first table and reused for the rest of the cycle
+_worker_replicator: Optional['Replicator'] = None
+
+
+def _init_worker_logging(log_level: str, log_queue: Optional[Any]):
+    """Send a worker process's log records to the main process's log listener."""
+    configure_logging(log_level, log_queue)
+
+
+def _get_worker_replicator(config: Config) -> Optional['Replicator']:
+    """Return this worker process's replicator, connecting it on the first table the worker is given."""
+    global _worker_replicator
+    if _worker_replicator is None:
+        # Database and BigQuery clients cannot be shared across processes, so each worker builds its own
+        # and reuses it, with its dataset listing and state connection, for every table it replicates
+        replicator = Replicator(config)
+        if not replicator.initialize():
+            replicator.close()
+            return None
+        atexit.register(replicator.close)
+        _worker_replicator = replicator
+    return _worker_replicator
+
+
+def _replicate_table_in_process(table_name: str, current_version: int, config: Config) -> bool:
+    """Replicate a single table in a worker process, on connections owned by that process."""
+    with log_table(table_name):
+        try:
+            replicator = _get_worker_replicator(config)
+            if replicator is None:
+                logger.error(f"Failed to initialize connections for table {table_name}")
+                return False
+            return replicator.replicate_table(table_name, current_version)
+        except Exception as e:
+            logger.error(f"Replication of table {table_name} failed with exception: {e}")
+            return False
 
-TABLES_TO_REPLICATE = os.getenv('TABLES_TO_REPLICATE', '').split(',')
-BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
 class Replicator:
     """Main replication orchestrator."""
     
-    def __init__(self):
-        self.sql_conn = SQLServerConnection()
-        self.bq_conn = BigQueryConnection()
+    def __init__(self, config: Config, log_queue: Optional[Any] = None):
+        self.config = config
+        self.log_queue = log_queue
+        self.sql_conn = SQLServerConnection(config)
+        self.bq_conn = BigQueryConnection(config)
         self.state_manager = StateManager()
     
     def initialize(self) -> bool:
@@ -43,9 +70,27 @@ class Replicator:
         """Close connections."""
         self.sql_conn.close()
         self.bq_conn.close()
+        self.state_manager.close()
     
-    def replicate_table(self, table_name: str) -> bool:
-        """Replicate a single table from SQL Server to BigQuery."""
+    def replicate_table(self, table_name: str, current_version: int = None) -> bool:
+        """
+        Replicate a single table from SQL Server to BigQuery.
+        
+        The table is brought up to current_version, which is read from SQL Server
+        when not given. A table that needs an initial load is brought up to the
+        version read after the load instead.
+        """
+        with log_table(table_name):
+            return self._replicate_table(table_name, current_version)
+    
+    def _replicate_table(self, table_name: str, current_version: Optional[int]) -> bool:
+        """Replicate a single table, with its log records already tagged with the table name."""
+        if current_version is None:
+            current_version = self.sql_conn.get_change_tracking_current_version()
+            if current_version is None:
+                logger.error("Failed to get the current change tracking version")
+                return False
+        
         logger.info(f"Starting replication for table: {table_name}")
         
         # Check if change tracking is enabled
@@ -73,37 +118,60 @@ class Replicator:
             
             # Perform initial full load
             logger.info(f"Performing initial full load for {table_name}")
-            df = self.sql_conn.get_all_data(table_name)
-            if df.empty:
-                logger.warning(f"No data found for initial load of {table_name}")
-            else:
-                if not self.bq_conn.load_dataframe(df, table_name):
-                    return False
+            # Batches are streamed from SQL Server straight into Parquet load jobs without holding the whole table
+            if not self.bq_conn.load_batches(self.sql_conn.iter_all_data(table_name), table_name):
+                return False
             
-            # Get current change tracking version
-            current_version = self.sql_conn.get_change_tracking_current_version()
-            self.state_manager.update_sync_version(table_name, current_version)
+            # The load read rows as of no single version, so changes committed while it ran may or may not be
+            # in it; catch up on them now, merging inserts so rows the load already copied are not duplicated
+            caught_up_version = self.sql_conn.get_change_tracking_current_version()
+            if caught_up_version is None:
+                logger.error("Failed to get the current change tracking version")
+                return False
+            
+            if not self._apply_changes(table_name, pk_columns, current_version, caught_up_version, merge_inserts=True):
+                return False
             
-            logger.info(f"Initial load completed for {table_name}, current version: {current_version}")
+            self.state_manager.update_sync_version(table_name, caught_up_version)
+            
+            logger.info(f"Initial load completed for {table_name}, current version: {caught_up_version}")
             return True
         
         # Get the last sync version
         last_sync_version = self.state_manager.get_last_sync_version(table_name)
         logger.info(f"Last sync version for {table_name}: {last_sync_version}")
         
+        if not self._apply_changes(table_name, pk_columns, last_sync_version, current_version):
+            return False
+        
+        # Update the sync version
+        self.state_manager.update_sync_version(table_name, current_version)
+        
+        logger.info(f"Replication completed for {table_name}, new version: {current_version}")
+        return True
+    
+    def _apply_changes(self, table_name: str, pk_columns: List[str], last_sync_version: int, current_version: int,
+                       merge_inserts: bool = False) -> bool:
+        """
+        Apply the changes made after last_sync_version up to current_version to the BigQuery table.
+        
+        With merge_inserts, inserted rows are merged on the primary key instead of
+        appended, so rows that may already be in the table are not duplicated.
+        """
         # Get changed data
-        changed_df, deleted_df, current_version = self.sql_conn.get_changed_data(
-            table_name, last_sync_version
+        inserted_data, updated_data, deleted_df, current_version = self.sql_conn.get_changed_data(
+            table_name, last_sync_version, pk_columns=pk_columns, current_version=current_version
         )
         
-        if current_version == 0:
+        if current_version is None:
             logger.error(f"Failed to get change tracking data for {table_name}")
             return False
         
-        # Process changes
-        if not changed_df.empty:
-            logger.info(f"Loading {len(changed_df)} changed rows for {table_name}")
-            if not self.bq_conn.load_dataframe(changed_df, table_name, write_disposition='WRITE_APPEND'):
+        # Process updates, which must replace the existing rows rather than add new ones; updates and deletes
+        # are idempotent, so they go first and are harmlessly repeated if the cycle is retried from this version
+        if updated_data.num_rows > 0:
+            logger.info(f"Merging {updated_data.num_rows} updated rows for {table_name}")
+            if not self.bq_conn.merge_rows(updated_data, table_name, pk_columns):
                 return False
         
         # Process deletes
@@ -112,24 +180,66 @@ class Replicator:
             if not self.bq_conn.delete_rows(table_name, deleted_df):
                 return False
         
-        # Update the sync version
-        self.state_manager.update_sync_version(table_name, current_version)
+        # Process inserts last, as a single all-or-nothing write, so a failed cycle never leaves
+        # appended rows behind to be appended again on the retry
+        if inserted_data.num_rows > 0:
+            logger.info(f"Loading {inserted_data.num_rows} inserted rows for {table_name}")
+            # Large change sets are merged through one staged load job rather than split over several appends
+            if merge_inserts or inserted_data.nbytes > STREAM_APPEND_MAX_BYTES:
+                loaded = self.bq_conn.merge_rows(inserted_data, table_name, pk_columns)
+            else:
+                loaded = self.bq_conn.stream_append(inserted_data, table_name, pk_columns)
+            if not loaded:
+                return False
         
-        logger.info(f"Replication completed for {table_name}, new version: {current_version}")
         return True
     
     def replicate_all_tables(self) -> bool:
         """Replicate all tables specified in the configuration."""
+        if not self.config.tables:
+            return True
+        
+        # The change tracking version is database-wide, so it is read once per cycle
+        current_version = self.sql_conn.get_change_tracking_current_version()
+        if current_version is None:
+            logger.error("Failed to get the current change tracking version")
+            return False
+        
+        # Skip tables that are already in sync before doing any per-table metadata work
+        pending_tables = []
+        for table_name in self.config.tables:
+            if (self.state_manager.get_last_sync_version(table_name) >= current_version
+                    and self.bq_conn.table_exists(table_name)):
+                logger.info(f"No changes detected for {table_name} since version {current_version}")
+            else:
+                pending_tables.append(table_name)
+        
+        if not pending_tables:
+            return True
+        
         success = True
         
-        for table_name in TABLES_TO_REPLICATE:
-            table_name = table_name.strip()
-            if not table_name:
-                continue
+        # Tables are independent pipelines, so replicate them in separate processes to keep the
+        # Arrow and Parquet encoding off a shared GIL; spawn avoids forking live client connections
+        with ProcessPoolExecutor(
+            max_workers=min(self.config.replication_workers, len(pending_tables)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker_logging,
+            initargs=(self.config.log_level, self.log_queue),
+        ) as executor:
+            futures = {
+                table_name: executor.submit(_replicate_table_in_process, table_name, current_version, self.config)
+                for table_name in pending_tables
+            }
+            for table_name, future in futures.items():
+                try:
+                    table_success = future.result()
+                except Exception as e:
+                    logger.error(f"Worker for table {table_name} failed: {e}", extra={'table': table_name})
+                    table_success = False
                 
-            table_success = self.replicate_table(table_name)
-            if not table_success:
-                logger.error(f"Failed to replicate table {table_name}")
-                success = False
+                if not table_success:
+                    logger.error(f"Failed to replicate table {table_name}", extra={'table': table_name})
+                    success = False
         
         return success
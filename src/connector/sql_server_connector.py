@@ -12,60 +12,127 @@ Requirements:
 - Service account with BigQuery Data Editor permissions
 """
 
-import os
-import sys
+import re
 import logging
-from typing import Dict, List, Tuple, Any
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyodbc
-from dotenv import load_dotenv
 from tqdm import tqdm
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('replication.log')
-    ]
-)
+from connector.config import Config
+
 logger = logging.getLogger('sql_to_bq_replicator')
 
-# Load environment variables
-load_dotenv()
+# Table names accepted from configuration
+_TABLE_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _quote_identifier(name: str) -> str:
+    """Wrap a column or table name in brackets for use in T-SQL."""
+    return '[' + name.replace(']', ']]') + ']'
+
+
+def _quote_table_name(table_name: str) -> str:
+    """Validate a configured table name and quote it for use in T-SQL."""
+    if not _TABLE_NAME_PATTERN.match(table_name):
+        raise ValueError(f"Invalid table name: {table_name!r}")
+    return _quote_identifier(table_name)
+
+
+# Python types reported by pyodbc in cursor.description mapped to Arrow column types
+_ODBC_TO_ARROW_TYPE = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    datetime: pa.timestamp('us'),
+    date: pa.date32(),
+    time: pa.time64('us'),
+    bytes: pa.binary(),
+    bytearray: pa.binary(),
+}
+
+
+def _odbc_to_arrow_type(type_code: type, precision: int, scale: int) -> pa.DataType:
+    """Get the Arrow type for a result column described by pyodbc, or None if it has no direct mapping."""
+    if type_code is Decimal:
+        return pa.decimal128(precision or 38, scale or 0)
+    return _ODBC_TO_ARROW_TYPE.get(type_code)
+
 
+# SQL Server column types mapped to Arrow column types; unmapped types fall back to the driver's description
+_SQL_TO_ARROW_TYPE = {
+    'varchar': pa.string(),
+    'nvarchar': pa.string(),
+    'char': pa.string(),
+    'nchar': pa.string(),
+    'text': pa.string(),
+    'ntext': pa.string(),
+    'uniqueidentifier': pa.string(),
+    'int': pa.int64(),
+    'smallint': pa.int64(),
+    'tinyint': pa.int64(),
+    'bigint': pa.int64(),
+    'money': pa.decimal128(19, 4),
+    'smallmoney': pa.decimal128(10, 4),
+    'float': pa.float64(),
+    'real': pa.float64(),
+    'date': pa.date32(),
+    'datetime': pa.timestamp('us'),
+    'datetime2': pa.timestamp('us'),
+    'smalldatetime': pa.timestamp('us'),
+    'time': pa.time64('us'),
+    'bit': pa.bool_(),
+    'binary': pa.binary(),
+    'varbinary': pa.binary(),
+    'image': pa.binary(),
+}
 
-SQL_SERVER = os.getenv('SQL_SERVER')
-SQL_DATABASE = os.getenv('SQL_DATABASE')
-SQL_USERNAME = os.getenv('SQL_USERNAME')
-SQL_PASSWORD = os.getenv('SQL_PASSWORD')
-SQL_DRIVER = os.getenv('SQL_DRIVER', '{ODBC Driver 17 for SQL Server}')
 
-BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
+def _sql_to_arrow_type(column: Dict[str, Any]) -> Optional[pa.DataType]:
+    """Get the Arrow type for a table column, or None if it has no direct mapping."""
+    if column['type'] in ('decimal', 'numeric'):
+        return pa.decimal128(column['precision'] or 38, column['scale'] or 0)
+    return _SQL_TO_ARROW_TYPE.get(column['type'])
 
 
+# Reuse ODBC connections across connect() calls instead of repeating the login handshake
+pyodbc.pooling = True
+
 
 class SQLServerConnection:
     """Manages connection to SQL Server and provides query methods."""
     
-    def __init__(self):
+    def __init__(self, config: Config):
         self.conn = None
         self.cursor = None
+        self.server = config.sql_server
+        self.database = config.sql_database
+        self.username = config.sql_username
+        self.password = config.sql_password
+        self.driver = config.sql_driver
+        self.fetch_size = config.sql_fetch_size
+        self._meta_cache: Dict[Tuple[str, str], Any] = {}
         
     def connect(self):
         """Establish connection to SQL Server."""
         try:
             connection_string = (
-                f'DRIVER={SQL_DRIVER};'
-                f'SERVER={SQL_SERVER};'
-                f'DATABASE={SQL_DATABASE};'
-                f'UID={SQL_USERNAME};'
-                f'PWD={SQL_PASSWORD}'
+                f'DRIVER={self.driver};'
+                f'SERVER={self.server};'
+                f'DATABASE={self.database};'
+                f'UID={self.username};'
+                f'PWD={self.password}'
             )
             self.conn = pyodbc.connect(connection_string)
             self.cursor = self.conn.cursor()
-            logger.info(f"Connected to SQL Server: {SQL_SERVER}, Database: {SQL_DATABASE}")
+            self.cursor.arraysize = self.fetch_size
+            self._meta_cache.clear()
+            logger.info(f"Connected to SQL Server: {self.server}, Database: {self.database}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to SQL Server: {e}")
@@ -94,8 +161,77 @@ class SQLServerConnection:
                 logger.error(f"Parameters: {params}")
             return []
     
+    def iter_batches(self, query: str, params: tuple = None, batch_size: int = None) -> Iterator[List[tuple]]:
+        """Execute a SQL query and yield its results in batches as they arrive."""
+        batch_size = batch_size or self.fetch_size
+        try:
+            if params:
+                self.cursor.execute(query, params)
+            else:
+                self.cursor.execute(query)
+            while True:
+                rows = self.cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            logger.error(f"Query: {query}")
+            if params:
+                logger.error(f"Parameters: {params}")
+            raise
+    
+    def _make_batch_converter(self, arrow_schema: Optional[pa.Schema] = None) -> Callable[[List[tuple]], pa.RecordBatch]:
+        """
+        Build a row-batch converter specialized to the current result set.
+        
+        Column types come from arrow_schema when it describes the column and from
+        cursor.description otherwise, so every batch is converted column-wise with
+        fixed types and no per-row inference.
+        """
+        known_types = {field.name: field.type for field in arrow_schema} if arrow_schema is not None else {}
+        
+        fields = []
+        stringified = []
+        for index, (name, type_code, _, _, precision, scale, _) in enumerate(self.cursor.description):
+            arrow_type = known_types.get(name) or _odbc_to_arrow_type(type_code, precision, scale)
+            if arrow_type is None:
+                # Values without a direct Arrow equivalent are carried as their string form
+                arrow_type = pa.string()
+            if pa.types.is_string(arrow_type) and type_code is not str:
+                stringified.append(index)
+            fields.append(pa.field(name, arrow_type))
+        
+        schema = pa.schema(fields)
+        column_types = [field.type for field in fields]
+        
+        def to_record_batch(rows: List[tuple]) -> pa.RecordBatch:
+            columns = list(zip(*rows))
+            for index in stringified:
+                columns[index] = [None if value is None else str(value) for value in columns[index]]
+            arrays = [pa.array(values, type=column_type) for values, column_type in zip(columns, column_types)]
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+        
+        return to_record_batch
+    
+    def _fetch_table(self, query: str, params: tuple = None, batch_size: int = None,
+                     arrow_schema: Optional[pa.Schema] = None) -> pa.Table:
+        """Execute a SQL query and collect its streamed results into an Arrow table."""
+        batches = []
+        to_record_batch = None
+        for batch in self.iter_batches(query, params, batch_size):
+            if to_record_batch is None:
+                to_record_batch = self._make_batch_converter(arrow_schema)
+            batches.append(to_record_batch(batch))
+        
+        return pa.Table.from_batches(batches) if batches else pa.table({})
+    
     def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         """Get the schema of a table."""
+        cache_key = ('schema', table_name)
+        if cache_key in self._meta_cache:
+            return [dict(column) for column in self._meta_cache[cache_key]]
+        
         columns = []
         try:
             schema_query = f"""
@@ -130,13 +266,38 @@ class SQLServerConnection:
                 }
                 columns.append(column)
             
-            return columns
+            if columns:
+                self._meta_cache[cache_key] = columns
+            return [dict(column) for column in columns]
         except Exception as e:
             logger.error(f"Failed to get schema for table {table_name}: {e}")
             return []
     
+    def get_arrow_schema(self, table_name: str) -> Optional[pa.Schema]:
+        """Get the Arrow schema of a table's mapped columns, derived once from its cached SQL schema."""
+        cache_key = ('arrow', table_name)
+        if cache_key in self._meta_cache:
+            return self._meta_cache[cache_key]
+        
+        columns = self.get_table_schema(table_name)
+        if not columns:
+            return None
+        
+        # Columns are left nullable, since deleted rows in a change set carry no source values
+        arrow_schema = pa.schema([
+            pa.field(column['name'], arrow_type)
+            for column in columns
+            if (arrow_type := _sql_to_arrow_type(column)) is not None
+        ])
+        self._meta_cache[cache_key] = arrow_schema
+        return arrow_schema
+    
     def is_change_tracking_enabled(self, table_name: str) -> bool:
         """Check if change tracking is enabled for the table."""
+        cache_key = ('ct', table_name)
+        if cache_key in self._meta_cache:
+            return self._meta_cache[cache_key]
+        
         query = """
         SELECT 
             t.name AS TableName,
@@ -154,21 +315,29 @@ class SQLServerConnection:
             logger.error(f"Table {table_name} not found")
             return False
         
-        return bool(result[0].IsChangeTrackingEnabled)
+        enabled = bool(result[0].IsChangeTrackingEnabled)
+        self._meta_cache[cache_key] = enabled
+        return enabled
     
-    def get_change_tracking_current_version(self) -> int:
-        """Get the current change tracking version."""
+    def get_change_tracking_current_version(self) -> Optional[int]:
+        """Get the current change tracking version, or None if it cannot be read."""
         query = "SELECT CHANGE_TRACKING_CURRENT_VERSION()"
         result = self.execute_query(query)
         
-        if not result:
+        # The version is NULL when change tracking is not enabled on the database; 0 is a valid version
+        # on a database that has not tracked any changes yet
+        if not result or result[0][0] is None:
             logger.error("Failed to get current change tracking version")
-            return 0
+            return None
         
         return result[0][0]
     
     def get_primary_key_columns(self, table_name: str) -> List[str]:
         """Get the primary key columns for a table."""
+        cache_key = ('pk', table_name)
+        if cache_key in self._meta_cache:
+            return list(self._meta_cache[cache_key])
+        
         query = """
         SELECT 
             c.name AS column_name
@@ -191,166 +360,168 @@ class SQLServerConnection:
             logger.error(f"No primary key found for table {table_name}")
             return []
         
-        return [row.column_name for row in results]
+        pk_columns = [row.column_name for row in results]
+        self._meta_cache[cache_key] = pk_columns
+        return list(pk_columns)
     
-    def get_all_data(self, table_name: str, batch_size: int = BATCH_SIZE) -> pd.DataFrame:
-        """Get all data from a table in batches."""
-        try:
-            # Get total row count
-            count_query = f"SELECT COUNT(*) FROM {table_name}"
-            count_result = self.execute_query(count_query)
-            total_rows = count_result[0][0] if count_result else 0
-            
-            if total_rows == 0:
-                logger.info(f"Table {table_name} is empty")
-                return pd.DataFrame()
-            
-            # Get primary key for efficient batching
-            pk_columns = self.get_primary_key_columns(table_name)
-            if not pk_columns:
-                logger.warning(f"No primary key found for {table_name}, using OFFSET/FETCH for batching")
-                return self._get_all_data_with_offset(table_name, batch_size, total_rows)
-            
+    def iter_all_data(self, table_name: str, batch_size: int = None) -> Iterator[pa.RecordBatch]:
+        """Yield all data from a table as Arrow record batches, holding only one batch at a time."""
+        batch_size = batch_size or self.fetch_size
+        
+        # Get primary key for efficient batching
+        pk_columns = self.get_primary_key_columns(table_name)
+        if not pk_columns:
+            logger.warning(f"No primary key found for {table_name}, using OFFSET/FETCH for batching")
+            yield from self._iter_all_data_with_offset(table_name, batch_size)
+        else:
             # Use primary key for batching
-            return self._get_all_data_with_pk(table_name, pk_columns[0], batch_size, total_rows)
-            
-        except Exception as e:
-            logger.error(f"Failed to get data from {table_name}: {e}")
-            return pd.DataFrame()
+            yield from self._iter_all_data_with_pk(table_name, pk_columns[0], batch_size)
     
-    def _get_all_data_with_offset(self, table_name: str, batch_size: int, total_rows: int) -> pd.DataFrame:
-        """Get all data using OFFSET/FETCH for batching."""
-        all_data = []
+    def _iter_all_data_with_offset(self, table_name: str, batch_size: int) -> Iterator[pa.RecordBatch]:
+        """Yield all data using OFFSET/FETCH for batching."""
+        arrow_schema = self.get_arrow_schema(table_name)
+        to_record_batch = None
+        offset = 0
+        query = f"""
+        SELECT * FROM {_quote_table_name(table_name)}
+        ORDER BY (SELECT NULL)
+        OFFSET ? ROWS
+        FETCH NEXT ? ROWS ONLY
+        """
         
-        with tqdm(total=total_rows, desc=f"Fetching {table_name}") as pbar:
-            for offset in range(0, total_rows, batch_size):
-                query = f"""
-                SELECT * FROM {table_name}
-                ORDER BY (SELECT NULL)
-                OFFSET {offset} ROWS
-                FETCH NEXT {batch_size} ROWS ONLY
-                """
-                batch = self.execute_query(query)
+        # The progress bar is only drawn when progress is being logged, so quiet runs skip its per-batch updates
+        with tqdm(desc=f"Fetching {table_name}", unit='rows', disable=not logger.isEnabledFor(logging.INFO)) as pbar:
+            while True:
+                page_rows = 0
+                for batch in self.iter_batches(query, (offset, batch_size), batch_size):
+                    if to_record_batch is None:
+                        to_record_batch = self._make_batch_converter(arrow_schema)
+                    page_rows += len(batch)
+                    pbar.update(len(batch))
+                    yield to_record_batch(batch)
                 
-                if not batch:
+                if page_rows < batch_size:
                     break
-                
-                # Convert to list of dictionaries
-                columns = [column[0] for column in self.cursor.description]
-                batch_dicts = [dict(zip(columns, row)) for row in batch]
-                all_data.extend(batch_dicts)
-                
-                pbar.update(len(batch))
-        
-        return pd.DataFrame(all_data)
+                offset += batch_size
     
-    def _get_all_data_with_pk(self, table_name: str, pk_column: str, batch_size: int, total_rows: int) -> pd.DataFrame:
-        """Get all data using primary key for batching."""
-        all_data = []
+    def _iter_all_data_with_pk(self, table_name: str, pk_column: str, batch_size: int) -> Iterator[pa.RecordBatch]:
+        """Yield all data using primary key for batching."""
+        arrow_schema = self.get_arrow_schema(table_name)
+        to_record_batch = None
         last_pk_value = None
         
-        with tqdm(total=total_rows, desc=f"Fetching {table_name}") as pbar:
+        # The query texts stay constant across pages so SQL Server can reuse their plans
+        table = _quote_table_name(table_name)
+        pk = _quote_identifier(pk_column)
+        first_page_query = f"""
+        SELECT TOP (?) * FROM {table}
+        ORDER BY {pk}
+        """
+        next_page_query = f"""
+        SELECT TOP (?) * FROM {table}
+        WHERE {pk} > ?
+        ORDER BY {pk}
+        """
+        
+        # The progress bar is only drawn when progress is being logged, so quiet runs skip its per-batch updates
+        with tqdm(desc=f"Fetching {table_name}", unit='rows', disable=not logger.isEnabledFor(logging.INFO)) as pbar:
             while True:
                 if last_pk_value is None:
-                    query = f"""
-                    SELECT TOP {batch_size} * FROM {table_name}
-                    ORDER BY {pk_column}
-                    """
-                    params = None
+                    query = first_page_query
+                    params = (batch_size,)
                 else:
-                    query = f"""
-                    SELECT TOP {batch_size} * FROM {table_name}
-                    WHERE {pk_column} > ?
-                    ORDER BY {pk_column}
-                    """
-                    params = (last_pk_value,)
+                    query = next_page_query
+                    params = (batch_size, last_pk_value)
                 
-                batch = self.execute_query(query, params)
+                page_rows = 0
+                for batch in self.iter_batches(query, params, batch_size):
+                    if to_record_batch is None:
+                        to_record_batch = self._make_batch_converter(arrow_schema)
+                    record_batch = to_record_batch(batch)
+                    
+                    # Update last PK value for next batch
+                    last_pk_value = batch[-1][record_batch.schema.get_field_index(pk_column)]
+                    
+                    page_rows += len(batch)
+                    pbar.update(len(batch))
+                    yield record_batch
                 
-                if not batch:
+                if page_rows < batch_size:
                     break
-                
-                # Convert to list of dictionaries
-                columns = [column[0] for column in self.cursor.description]
-                batch_dicts = [dict(zip(columns, row)) for row in batch]
-                all_data.extend(batch_dicts)
-                
-                # Update last PK value for next batch
-                last_pk_value = batch[-1][columns.index(pk_column)]
-                
-                pbar.update(len(batch))
-                
-                if len(batch) < batch_size:
-                    break
-        
-        return pd.DataFrame(all_data)
     
-    def get_changed_data(self, table_name: str, last_sync_version: int) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+    def get_changed_data(self, table_name: str, last_sync_version: int, *,
+                         pk_columns: List[str], current_version: int
+                         ) -> Tuple[pa.Table, pa.Table, pd.DataFrame, Optional[int]]:
         """
         Get changed data since the last sync version.
         
+        The caller passes the primary key columns and current change tracking
+        version it has already looked up, so no metadata queries are repeated.
+        
         Returns:
             Tuple containing:
-            - DataFrame of inserted/updated rows
+            - Arrow table of inserted rows
+            - Arrow table of updated rows
             - DataFrame of deleted primary keys
-            - Current change tracking version
+            - Current change tracking version, or None if the changes could not be read
         """
-        if not self.is_change_tracking_enabled(table_name):
-            logger.error(f"Change tracking is not enabled for table {table_name}")
-            return pd.DataFrame(), pd.DataFrame(), 0
-        
-        current_version = self.get_change_tracking_current_version()
-        
         if current_version <= last_sync_version:
             logger.info(f"No changes detected for {table_name} since version {last_sync_version}")
-            return pd.DataFrame(), pd.DataFrame(), current_version
+            return pa.table({}), pa.table({}), pd.DataFrame(), current_version
         
-        # Get primary key columns
-        pk_columns = self.get_primary_key_columns(table_name)
         if not pk_columns:
             logger.error(f"Cannot track changes for {table_name} without a primary key")
-            return pd.DataFrame(), pd.DataFrame(), 0
-        
-        pk_columns_str = ', '.join(pk_columns)
-        
-        # Get changed rows (inserts and updates)
-        changed_query = f"""
-        SELECT t.*, CT.SYS_CHANGE_OPERATION
-        FROM {table_name} t
-        INNER JOIN CHANGETABLE(CHANGES {table_name}, {last_sync_version}) CT
-        ON {' AND '.join([f't.{pk} = CT.{pk}' for pk in pk_columns])}
-        WHERE CT.SYS_CHANGE_OPERATION IN ('I', 'U')
-        """
+            return pa.table({}), pa.table({}), pd.DataFrame(), None
         
         try:
-            # Execute query and convert to DataFrame
-            changed_rows = self.execute_query(changed_query)
-            if changed_rows:
-                columns = [column[0] for column in self.cursor.description]
-                changed_dicts = [dict(zip(columns, row)) for row in changed_rows]
-                changed_df = pd.DataFrame(changed_dicts)
-            else:
-                changed_df = pd.DataFrame()
+            table = _quote_table_name(table_name)
             
-            # Get deleted rows (only primary keys)
-            deleted_query = f"""
-            SELECT {pk_columns_str}
-            FROM CHANGETABLE(CHANGES {table_name}, {last_sync_version}) CT
-            WHERE CT.SYS_CHANGE_OPERATION = 'D'
+            # Primary keys are read from CHANGETABLE under aliases, since deleted rows have no match in the table
+            key_aliases = [f"__ct_{pk}" for pk in pk_columns]
+            key_columns = ', '.join([
+                f"CT.{_quote_identifier(pk)} AS {_quote_identifier(alias)}"
+                for pk, alias in zip(pk_columns, key_aliases)
+            ])
+            
+            # Get inserts, updates and deletes in a single pass over the change table, bounded by current_version
+            # so changes committed after it was read are left for the next cycle instead of being applied twice
+            changes_query = f"""
+            SELECT CT.SYS_CHANGE_OPERATION, {key_columns}, t.*
+            FROM CHANGETABLE(CHANGES {table}, ?) CT
+            LEFT JOIN {table} t
+            ON {' AND '.join([f't.{_quote_identifier(pk)} = CT.{_quote_identifier(pk)}' for pk in pk_columns])}
+            WHERE CT.SYS_CHANGE_VERSION <= ?
             """
             
-            deleted_rows = self.execute_query(deleted_query)
-            if deleted_rows:
-                deleted_columns = pk_columns
-                deleted_dicts = [dict(zip(deleted_columns, row)) for row in deleted_rows]
-                deleted_df = pd.DataFrame(deleted_dicts)
+            # Stream the changes straight into Arrow batches
+            changes = self._fetch_table(
+                changes_query, (last_sync_version, current_version), arrow_schema=self.get_arrow_schema(table_name)
+            )
+            
+            if changes.num_rows == 0:
+                inserted_table, updated_table, deleted_df = pa.table({}), pa.table({}), pd.DataFrame()
             else:
-                deleted_df = pd.DataFrame()
+                operation = changes.column('SYS_CHANGE_OPERATION')
+                tracking_columns = {'SYS_CHANGE_OPERATION', *key_aliases}
+                row_columns = [name for name in changes.column_names if name not in tracking_columns]
+                
+                # Inserted or updated rows deleted again before this read have no match in the table and come
+                # back with NULL columns; they are skipped here and removed by their delete in a later cycle
+                row_exists = pc.is_valid(changes.column(pk_columns[0]))
+                inserted_table = changes.filter(pc.and_(pc.equal(operation, 'I'), row_exists)).select(row_columns)
+                updated_table = changes.filter(pc.and_(pc.equal(operation, 'U'), row_exists)).select(row_columns)
+                
+                deleted_df = changes.filter(
+                    pc.equal(operation, 'D')
+                ).select(key_aliases).rename_columns(pk_columns).to_pandas()
             
-            logger.info(f"Found {len(changed_df)} changed rows and {len(deleted_df)} deleted rows for {table_name}")
+            logger.info(
+                f"Found {inserted_table.num_rows} inserted, {updated_table.num_rows} updated "
+                f"and {len(deleted_df)} deleted rows for {table_name}"
+            )
             
-            return changed_df, deleted_df, current_version
+            return inserted_table, updated_table, deleted_df, current_version
             
         except Exception as e:
             logger.error(f"Failed to get changed data for {table_name}: {e}")
-            return pd.DataFrame(), pd.DataFrame(), 0
+            return pa.table({}), pa.table({}), pd.DataFrame(), None
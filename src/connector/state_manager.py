@@ -1,66 +1,80 @@
 
 import os
-import sys
 import logging
 import json
+import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict, Any
 
-from dotenv import load_dotenv
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('replication.log')
-    ]
-)
 logger = logging.getLogger('sql_to_bq_replicator')
 
-# Load environment variables
-load_dotenv()
-
 
 class StateManager:
     """Manages the replication state for tracking sync versions."""
     
-    def __init__(self, state_file: str = 'replication_state.json'):
+    def __init__(self, state_file: str = 'replication_state.db', legacy_state_file: str = 'replication_state.json'):
         self.state_file = state_file
-        self.state = self._load_state()
+        self._lock = threading.Lock()
+        
+        # WAL journaling keeps every update a small atomic transaction and lets readers run concurrently
+        self.conn = sqlite3.connect(state_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sync_state ('
+            'table_name TEXT PRIMARY KEY, version INTEGER NOT NULL, updated TEXT NOT NULL)'
+        )
+        
+        self._import_legacy_state(legacy_state_file)
     
-    def _load_state(self) -> Dict[str, Dict[str, Any]]:
-        """Load the replication state from the state file."""
-        if os.path.exists(self.state_file):
+    def _import_legacy_state(self, legacy_state_file: str):
+        """Seed an empty state store from the JSON state file used by earlier versions."""
+        if not os.path.exists(legacy_state_file):
+            return
+        
+        with self._lock:
+            if self.conn.execute('SELECT 1 FROM sync_state LIMIT 1').fetchone():
+                return
+            
             try:
-                with open(self.state_file, 'r') as f:
-                    return json.load(f)
+                with open(legacy_state_file, 'r') as f:
+                    legacy_state = json.load(f)
+                
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO sync_state (table_name, version, updated) VALUES (?, ?, ?)',
+                    [
+                        (table_name, table_state.get('last_sync_version', 0), table_state.get('last_sync_time', ''))
+                        for table_name, table_state in legacy_state.items()
+                    ]
+                )
+                logger.info(f"Imported replication state for {len(legacy_state)} tables from {legacy_state_file}")
             except Exception as e:
-                logger.error(f"Failed to load state file: {e}")
-                return {}
-        else:
-            return {}
+                logger.error(f"Failed to import legacy state file: {e}")
     
-    def _save_state(self):
-        """Save the replication state to the state file."""
-        try:
-            with open(self.state_file, 'w') as f:
-                json.dump(self.state, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save state file: {e}")
+    def close(self):
+        """Close the state store."""
+        with self._lock:
+            self.conn.close()
     
     def get_last_sync_version(self, table_name: str) -> int:
         """Get the last sync version for a table."""
-        table_state = self.state.get(table_name, {})
-        return table_state.get('last_sync_version', 0)
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    'SELECT version FROM sync_state WHERE table_name = ?', (table_name,)
+                ).fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"Failed to read sync version for {table_name}: {e}")
+            return 0
     
     def update_sync_version(self, table_name: str, version: int):
         """Update the sync version for a table."""
-        if table_name not in self.state:
-            self.state[table_name] = {}
-        
-        self.state[table_name]['last_sync_version'] = version
-        self.state[table_name]['last_sync_time'] = datetime.now().isoformat()
-        
-        self._save_state()
+        try:
+            with self._lock:
+                self.conn.execute(
+                    'INSERT INTO sync_state (table_name, version, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT(table_name) DO UPDATE SET version = excluded.version, updated = excluded.updated',
+                    (table_name, version, datetime.now().isoformat())
+                )
+        except Exception as e:
+            logger.error(f"Failed to save sync version for {table_name}: {e}")
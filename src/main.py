@@ -12,65 +12,42 @@ Requirements:
 - Service account with BigQuery Data Editor permissions
 """
 
-import os
 import sys
 import logging
-from dotenv import load_dotenv
+import multiprocessing
+from connector.config import Config
+from connector.logging_config import configure_logging, start_log_listener
 from connector.replicator import Replicator
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('replication.log')
-    ]
-)
 logger = logging.getLogger('sql_to_bq_replicator')
 
-# Load environment variables
-load_dotenv()
-
-# Configuration
-
-
-GOOGLE_APPLICATION_CREDENTIALS = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-BQ_PROJECT_ID = os.getenv('BQ_PROJECT_ID')
-BQ_DATASET = os.getenv('BQ_DATASET')
-
-SQL_SERVER = os.getenv('SQL_SERVER')
-SQL_DATABASE = os.getenv('SQL_DATABASE')
-SQL_USERNAME = os.getenv('SQL_USERNAME')
-SQL_PASSWORD = os.getenv('SQL_PASSWORD')
-SQL_DRIVER = os.getenv('SQL_DRIVER', '{ODBC Driver 17 for SQL Server}')
-
-TABLES_TO_REPLICATE = os.getenv('TABLES_TO_REPLICATE', '').split(',')
-BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-
-# Set log level from environment
-logger.setLevel(getattr(logging, LOG_LEVEL))
-
 def main():
     """Main entry point for the replication script."""
-    logger.info("Starting SQL Server to BigQuery replication")
-    
-    # Validate configuration
-    if not SQL_SERVER or not SQL_DATABASE:
-        logger.error("SQL Server configuration is missing")
+    # Read the configuration once; worker processes receive this object instead of re-reading the environment
+    try:
+        config = Config.from_env()
+    except ValueError as e:
+        configure_logging('ERROR')
+        logger.error(str(e))
         return 1
     
-    if not BQ_PROJECT_ID or not BQ_DATASET:
-        logger.error("BigQuery configuration is missing")
-        return 1
+    # A background listener owns stdout; this process and every worker only enqueue records
+    log_queue = multiprocessing.get_context('spawn').Queue(-1)
+    listener = start_log_listener(log_queue)
+    configure_logging(config.log_level, log_queue)
     
-    if not TABLES_TO_REPLICATE:
-        logger.error("No tables specified for replication")
-        return 1
+    try:
+        return replicate(config, log_queue)
+    finally:
+        listener.stop()
+
+
+def replicate(config: Config, log_queue) -> int:
+    """Replicate every configured table."""
+    logger.info("Starting SQL Server to BigQuery replication")
     
     # Initialize replicator
-    replicator = Replicator()
+    replicator = Replicator(config, log_queue)
     if not replicator.initialize():
         logger.error("Failed to initialize connections")
         return 1
@@ -93,5 +70,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import io  # Required for in-memory Parquet conversion
     sys.exit(main())
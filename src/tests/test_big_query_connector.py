@@ -0,0 +1,65 @@
+import json
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import pandas as pd
+from google.cloud import bigquery
+
+from connector.big_query_connector import BigQueryConnection
+from connector.config import Config
+
+
+def _make_connection() -> BigQueryConnection:
+    """Create a BigQuery connection whose client records queries instead of running them."""
+    config = Config(
+        sql_server='server', sql_database='database', sql_username=None, sql_password=None, sql_driver='driver',
+        google_application_credentials=None, bq_project_id='project', bq_dataset='dataset', tables=('sales',),
+    )
+    connection = BigQueryConnection(config)
+    connection.client = mock.Mock()
+    return connection
+
+
+def _sent_parameters(connection: BigQueryConnection) -> dict:
+    """Return the query parameters of the last query as the JSON the client would send."""
+    job_config = connection.client.query.call_args.kwargs['job_config']
+    return json.loads(json.dumps([parameter.to_api_repr() for parameter in job_config.query_parameters]))
+
+
+class DeleteRowsWithParametersTest(unittest.TestCase):
+    """Deletes of small key sets pass the keys as query parameters."""
+    
+    def test_date_key_is_sent_as_datetime(self):
+        connection = _make_connection()
+        pk_df = pd.DataFrame({'sales_date': [date(2024, 1, 2), date(2024, 1, 3)]})
+        
+        connection._delete_rows_with_parameters('sales', pk_df, [bigquery.SchemaField('sales_date', 'DATETIME')])
+        
+        values = _sent_parameters(connection)[0]['parameterValue']['arrayValues']
+        self.assertEqual(
+            [value['value'] for value in values],
+            ['2024-01-02T00:00:00.000000', '2024-01-03T00:00:00.000000'],
+        )
+    
+    def test_composite_key_with_date(self):
+        connection = _make_connection()
+        pk_df = pd.DataFrame({'store_id': [7, 8], 'sales_date': [date(2024, 1, 2), datetime(2024, 1, 3, 12, 30)]})
+        pk_fields = [bigquery.SchemaField('store_id', 'INTEGER'), bigquery.SchemaField('sales_date', 'DATETIME')]
+        
+        connection._delete_rows_with_parameters('sales', pk_df, pk_fields)
+        
+        query = connection.client.query.call_args.args[0]
+        self.assertIn('K.`store_id` = T.`store_id` AND K.`sales_date` = T.`sales_date`', query)
+        values = _sent_parameters(connection)[0]['parameterValue']['arrayValues']
+        self.assertEqual(
+            [value['structValues'] for value in values],
+            [
+                {'store_id': {'value': '7'}, 'sales_date': {'value': '2024-01-02T00:00:00.000000'}},
+                {'store_id': {'value': '8'}, 'sales_date': {'value': '2024-01-03T12:30:00.000000'}},
+            ],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()